@@ -1,6 +1,7 @@
 #from .execute import execute as fit
 from .version import version
-from .execute import fit
+from .execute import fit, fit_params
+from .batch import ResultTable, fit_batch, fit_batch_parallel
 
 # def fit(d):
 #     return {
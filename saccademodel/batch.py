@@ -0,0 +1,281 @@
+'''
+Fit many trials and collect the results into columns.
+
+The columns are filled incrementally, one trial at a time, so that a
+session can be fitted in a streaming manner without keeping the divided
+gazepoints of every trial in memory.
+'''
+from array import array
+from itertools import count
+from .execute import fit_params
+from .em import saccade_model_em_params
+from .preprocess import gaze_repair
+
+# Column names and array typecodes in table order.
+COLUMNS = [
+    ('trial_id', 'l'),
+    ('t_start', 'l'),
+    ('t_end', 'l'),
+    ('latency', 'd'),
+    ('duration', 'd'),
+    ('mse', 'd'),
+    ('source_sse', 'd'),
+    ('saccade_sse', 'd'),
+    ('target_sse', 'd'),
+    ('source_x', 'd'),
+    ('source_y', 'd'),
+    ('target_x', 'd'),
+    ('target_y', 'd'),
+]
+
+# NumPy dtypes for the typecodes above.
+_NUMPY_TYPES = {
+    'l': 'i8',
+    'd': 'f8',
+}
+
+
+class ResultTable(object):
+    '''
+    Columnar storage for fit parameters, one row per trial.
+
+    Parameter
+        framerate, optional, samples per second. If given, latency and
+            duration are in seconds. Otherwise they are in samples.
+    '''
+
+    def __init__(self, framerate=None):
+        self.framerate = framerate
+        self._columns = {}
+        for name, typecode in COLUMNS:
+            self._columns[name] = array(typecode)
+
+    def __len__(self):
+        return len(self._columns['trial_id'])
+
+    def __repr__(self):
+        return '{0}({1} rows)'.format(self.__class__.__name__, len(self))
+
+    def __getitem__(self, name):
+        '''
+        Return the column with the given name as an array.
+        '''
+        return self._columns[name]
+
+    def append(self, trial_id, params):
+        '''
+        Append a row.
+
+        Parameter
+            trial_id, integer
+            params, dict returned by saccademodel.fit_params
+        '''
+        t_start = params['t_start']
+        t_end = params['t_end']
+        latency = float(t_start)
+        duration = float(t_end - t_start)
+        if self.framerate is not None:
+            latency = latency / self.framerate
+            duration = duration / self.framerate
+        src = params['source_mean']
+        tgt = params['target_mean']
+
+        c = self._columns  # alias
+        c['trial_id'].append(trial_id)
+        c['t_start'].append(t_start)
+        c['t_end'].append(t_end)
+        c['latency'].append(latency)
+        c['duration'].append(duration)
+        c['mse'].append(params['mean_squared_error'])
+        c['source_sse'].append(params['source_sse'])
+        c['saccade_sse'].append(params['saccade_sse'])
+        c['target_sse'].append(params['target_sse'])
+        c['source_x'].append(src[0])
+        c['source_y'].append(src[1])
+        c['target_x'].append(tgt[0])
+        c['target_y'].append(tgt[1])
+
+    def to_numpy(self):
+        '''
+        Return
+            NumPy structured array with a field for each column.
+
+        Throw
+            ImportError if NumPy is not installed
+        '''
+        import numpy as np
+        dtype = [(name, _NUMPY_TYPES[typecode]) for name, typecode in COLUMNS]
+        arr = np.empty(len(self), dtype=dtype)
+        for name, _ in COLUMNS:
+            arr[name] = np.asarray(self._columns[name])
+        return arr
+
+    def to_arrow(self):
+        '''
+        Return
+            pyarrow.Table with a column for each column.
+
+        Throw
+            ImportError if pyarrow is not installed
+        '''
+        import pyarrow as pa
+        types = {
+            'l': pa.int64(),
+            'd': pa.float64(),
+        }
+        arrays = [pa.array(self._columns[name], type=types[typecode])
+                  for name, typecode in COLUMNS]
+        names = [name for name, _ in COLUMNS]
+        return pa.Table.from_arrays(arrays, names=names)
+
+    def write_parquet(self, path):
+        '''
+        Write the table into a Parquet file.
+
+        Throw
+            ImportError if pyarrow is not installed
+        '''
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path)
+
+
+def fit_batch(pointlists, trial_ids=None, table=None, framerate=None):
+    '''
+    Fit each trial and append its parameters into a table.
+
+    Parameter
+        pointlists, iterable of pointlists. Can be a generator.
+        trial_ids, optional iterable of integers. Defaults to 0, 1, 2...
+        table, optional ResultTable to append to. Allows to continue
+            the same table over multiple calls.
+        framerate, samples per second for a new table. Ignored if
+            table is given.
+    Return
+        ResultTable
+    '''
+    if table is None:
+        table = ResultTable(framerate)
+    if trial_ids is None:
+        trial_ids = count(len(table))
+    trial_ids = iter(trial_ids)
+
+    for pointlist in pointlists:
+        table.append(next(trial_ids), fit_params(pointlist))
+
+    return table
+
+
+def fit_batch_parallel(pointlists, trial_ids=None, table=None,
+                       framerate=None, processes=None):
+    '''
+    Like fit_batch but fit the trials in multiple processes.
+
+    The repaired gazepoints of all the trials are copied once into
+    a shared memory block. Workers receive only the (offset, length) of
+    their trial in the block and send back only the model parameters.
+    Therefore the data passed between the processes does not grow with
+    the number of gazepoints. Requires Python 3.8 or newer.
+
+    Parameter
+        pointlists, iterable of pointlists
+        trial_ids, optional iterable of integers. Defaults to 0, 1, 2...
+        table, optional ResultTable to append to.
+        framerate, samples per second for a new table. Ignored if
+            table is given.
+        processes, number of worker processes. Defaults to the number
+            of CPUs.
+    Return
+        ResultTable
+    '''
+    from multiprocessing import Pool, cpu_count
+    from multiprocessing.shared_memory import SharedMemory
+
+    if table is None:
+        table = ResultTable(framerate)
+    if trial_ids is None:
+        trial_ids = count(len(table))
+    trial_ids = iter(trial_ids)
+
+    # Pack the repaired gazepoints as consecutive x, y doubles.
+    samples = array('d')
+    descriptors = []
+    for pointlist in pointlists:
+        repaired = gaze_repair(pointlist)
+        descriptors.append((len(samples) // 2, len(repaired)))
+        for p in repaired:
+            samples.append(p[0])
+            samples.append(p[1])
+
+    if len(descriptors) == 0:
+        return table
+    if processes is None:
+        processes = cpu_count()
+
+    nbytes = len(samples) * samples.itemsize
+    shm = SharedMemory(create=True, size=nbytes)
+    try:
+        shm.buf[:nbytes] = samples.tobytes()
+        pool = Pool(processes, _attach_worker, (shm.name,))
+        try:
+            chunksize = max(1, len(descriptors) // (4 * processes))
+            results = pool.imap(_fit_shared, descriptors, chunksize)
+            for compact in results:
+                table.append(next(trial_ids), _expand_params(compact))
+        finally:
+            pool.terminate()
+            pool.join()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return table
+
+
+# Shared memory block of the worker process, see _attach_worker.
+_worker_shm = None
+
+
+def _attach_worker(name):
+    # Pool initializer. Attach to the shared gazepoints once per worker.
+    from multiprocessing.shared_memory import SharedMemory
+    global _worker_shm
+    try:
+        # The parent owns the block. Do not let the worker unlink it.
+        _worker_shm = SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python older than 3.13
+        _worker_shm = SharedMemory(name=name)
+
+
+def _fit_shared(descriptor):
+    # Fit the trial at (offset, length) in the shared gazepoints.
+    offset, length = descriptor
+    samples = _worker_shm.buf.cast('d')[2 * offset:2 * (offset + length)]
+    flat = samples.tolist()
+    samples.release()
+    pointlist = [[flat[i], flat[i + 1]] for i in range(0, len(flat), 2)]
+    return _compact_params(saccade_model_em_params(pointlist))
+
+
+def _compact_params(params):
+    # Params dict as a flat tuple to keep interprocess messages small.
+    src = params['source_mean']
+    tgt = params['target_mean']
+    return (params['t_start'], params['t_end'],
+            params['mean_squared_error'], params['source_sse'],
+            params['saccade_sse'], params['target_sse'],
+            src[0], src[1], tgt[0], tgt[1])
+
+
+def _expand_params(compact):
+    # Inverse of _compact_params.
+    return {
+        't_start': compact[0],
+        't_end': compact[1],
+        'mean_squared_error': compact[2],
+        'source_sse': compact[3],
+        'saccade_sse': compact[4],
+        'target_sse': compact[5],
+        'source_mean': [compact[6], compact[7]],
+        'target_mean': [compact[8], compact[9]],
+    }
@@ -1,7 +1,7 @@
 from .mle import saccade_model_mle
 from .utils import *
 
-def saccade_model_em(pointlist):
+def saccade_model_em_params(pointlist):
     '''
     Estimates the reaction time and duration of the saccade by
     fitting a saccade model to the data.
@@ -27,10 +27,15 @@ def saccade_model_em(pointlist):
       pointlist, list of [x, y] points. 'None' values are not allowed.
 
     Output arguments
-      source_points
-      saccade_points
-      target_points
-      mean_squared_error
+      dict with keys
+        t_start, saccade start time
+        t_end, saccade end time
+        mean_squared_error
+        source_sse, source summed squared error
+        saccade_sse, saccade summed squared error
+        target_sse, target summed squared error
+        source_mean, [x, y] source point of the model
+        target_mean, [x, y] target point of the model
 
     Here we use two different concepts, times and indices:
       Time t  0 1 2 3 4 5
@@ -61,6 +66,9 @@ def saccade_model_em(pointlist):
     max_iters = 50
     em_iters = 0
     for _ in range(max_iters):
+        # The model error is relative to the means given to the MLE.
+        mu_s_model = mu_s
+        mu_t_model = mu_t
         t_start_hat, t_end_hat, mse, src_sse, sacc_sse, tgt_sse = saccade_model_mle(g, mu_s, mu_t, t_start, t_end)
 
         if t_end_hat < t_start_hat:
@@ -89,6 +97,8 @@ def saccade_model_em(pointlist):
                 'src_sse': src_sse,
                 'sacc_sse': sacc_sse,
                 'tgt_sse': tgt_sse,
+                'mu_s': mu_s_model,
+                'mu_t': mu_t_model,
             })
             # The next round either is minimal again or goes here.
             em_iters += 1
@@ -102,6 +112,8 @@ def saccade_model_em(pointlist):
             src_sse = d['src_sse']
             sacc_sse = d['sacc_sse']
             tgt_sse = d['tgt_sse']
+            mu_s_model = d['mu_s']
+            mu_t_model = d['mu_t']
             break
 
     if em_iters == max_iters:
@@ -109,9 +121,41 @@ def saccade_model_em(pointlist):
     else:
         did_converge = True
 
+    return {
+        't_start': t_start,
+        't_end': t_end,
+        'mean_squared_error': mse,
+        'source_sse': src_sse,
+        'saccade_sse': sacc_sse,
+        'target_sse': tgt_sse,
+        'source_mean': mu_s_model,
+        'target_mean': mu_t_model,
+    }
+
+
+def saccade_model_em(pointlist):
+    '''
+    Estimates the reaction time and duration of the saccade like
+    saccade_model_em_params but returns the gazepoints divided into
+    the three phases.
+
+    Input arguments
+      pointlist, list of [x, y] points. 'None' values are not allowed.
+
+    Output arguments
+      source_points
+      saccade_points
+      target_points
+      mean_squared_error
+    '''
+    g = pointlist
+    params = saccade_model_em_params(g)
+    t_start = params['t_start']
+    t_end = params['t_end']
+
     source_points = select_points_time_to_time(g, 0, t_start)
     saccade_points = select_points_time_to_time(g, t_start, t_end)
     target_points = select_points_time_to_time(g, t_end, None)
-    mean_squared_error = mse
+    mean_squared_error = params['mean_squared_error']
 
     return source_points, saccade_points, target_points, mean_squared_error
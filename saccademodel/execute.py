@@ -1,6 +1,6 @@
 from .preprocess import gaze_repair
 from math import floor
-from .em import saccade_model_em
+from .em import saccade_model_em, saccade_model_em_params
 
 def fit(pointlist):
     '''
@@ -18,3 +18,19 @@ def fit(pointlist):
         'target_points': tgt,
         'mean_squared_error': mle
     }
+
+def fit_params(pointlist):
+    '''
+    Like fit but return only the compact model parameters instead of
+    the divided gazepoints.
+
+    Parameter
+      pointlist
+        [[x0,y0], [x1,y1], ...]
+    Return
+      dict with keys t_start, t_end, mean_squared_error, source_sse,
+      saccade_sse, target_sse, source_mean, and target_mean.
+    '''
+
+    gapless_pointlist = gaze_repair(pointlist)
+    return saccade_model_em_params(gapless_pointlist)
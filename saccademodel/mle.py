@@ -1,8 +1,13 @@
 
 from .triangle import Triangle
 
+# Slack for the lower bounds, relative to the largest possible summed
+# squared error, so that rounding errors never prune the optimum.
+PRUNE_TOLERANCE = 1e-9
 
-def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
+
+def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end,
+                      prune=True, stats=None):
     '''
 
     Parameter
@@ -11,6 +16,11 @@ def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
         tgt_xy, 2D list, best guess for saccade end location
         init_t_start, best guess for saccade start time
         init_t_end, best guess for saccade end time
+        prune, optional, if True, skip the candidate times that cannot
+            beat the best one found so far. The result is the same.
+        stats, optional dict. If given, the number of candidate times
+            is added to stats['candidates'] and the number of skipped
+            candidate times to stats['skipped'].
     Return
         t_start
             optimal saccade start time.
@@ -54,6 +64,16 @@ def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
     #    Because target_mem[k] = square_error(k) + target_mem[k+1]
     #    calculate values dynamically from the end.
     target_mem = [None for _ in range(max_t)]
+    # 4) For each time t, store the summed square distance in t=0..t
+    #    from the gazepoints to the line segment between src_xy and tgt_xy
+    #    so that segment_mem[0] is 0 and segment_mem[max_t] gives the sum
+    #    over all the gazepoints. Every model point is on the segment, so
+    #    segment_mem[t2] - segment_mem[t1] is a lower bound for the summed
+    #    square error in t=t1..t2 and is used to prune the searches.
+    segment_mem = [0 for _ in range(max_t + 1)]
+    # Rounding errors in the summed square errors are negligible compared
+    # to prune_slack. Computed together with segment_mem.
+    prune_slack = 0
 
 
     def square_error(index, mu):
@@ -63,6 +83,33 @@ def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
         return dx * dx + dy * dy
 
 
+    def segment_error(index):
+        p = g[index]
+        dx = tgt_xy[0] - src_xy[0]
+        dy = tgt_xy[1] - src_xy[1]
+        dd = dx * dx + dy * dy
+        if dd == 0:
+            return square_error(index, src_xy)
+        # Progression of the closest point on the segment.
+        u = ((p[0] - src_xy[0]) * dx + (p[1] - src_xy[1]) * dy) / float(dd)
+        u = min(max(u, 0.0), 1.0)
+        return square_error(index, [src_xy[0] + u * dx, src_xy[1] + u * dy])
+
+
+    def segment_bound(t1, t2):
+        '''
+        Return
+            lower bound for the summed square error between t=t1 and t=t2
+        '''
+        return segment_mem[t2] - segment_mem[t1]
+
+
+    def count_candidates(n_candidates, n_skipped):
+        if stats is not None:
+            stats['candidates'] = stats.get('candidates', 0) + n_candidates
+            stats['skipped'] = stats.get('skipped', 0) + n_skipped
+
+
     def source_objective(t_start):
         '''
         Return
@@ -158,6 +205,13 @@ def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
         Given t_end, find t_start such that the sum of source_objective and
         saccade_objective is minimized.
 
+        The source error is non-decreasing in t and, because the source
+        point is on the segment, grows at least as fast as the segment
+        bound of the saccade error shrinks. Therefore
+        source_objective(t) + segment_bound(t, t_end) is a lower bound
+        for every t' >= t and the scan can stop when the bound reaches
+        the minimum.
+
         Return
             t_start, optimal
             src_sse, source summed squared error
@@ -167,8 +221,15 @@ def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
         min_src_sse = float('inf')
         min_sacc_sse = float('inf')
         t_min_sse = 0
+        n_skipped = 0
         for t in range(0, t_end + 1):
             src_sse = source_objective(t)
+            if prune:
+                bound = src_sse + segment_bound(t, t_end)
+                if bound - prune_slack >= min_sse:
+                    # Ties go to the smallest t so none of t..t_end win.
+                    n_skipped = t_end + 1 - t
+                    break
             sacc_sse = saccade_objective(t, t_end)
             sse = src_sse + sacc_sse
             if sse < min_sse:
@@ -176,6 +237,7 @@ def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
                 min_src_sse = src_sse
                 min_sacc_sse = sacc_sse
                 t_min_sse = t
+        count_candidates(t_end + 1, n_skipped)
         return t_min_sse, min_src_sse, min_sacc_sse
 
 
@@ -184,6 +246,10 @@ def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
         Given t_start, find t_end such that the sum of saccade_objective and
         target_objective is minimized.
 
+        The candidates are scanned from the end. Like in
+        find_optimal_t_start, target_objective(t) + segment_bound(t_start, t)
+        is a lower bound for every t' <= t.
+
         Return
             t_end, optimal
             sacc_sse, saccade summed squared error
@@ -193,18 +259,34 @@ def saccade_model_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
         min_sacc_sse = float('inf')
         min_tgt_sse = float('inf')
         t_min_sse = 0
-        for t in range(t_start, max_t + 1):
-            sacc_sse = saccade_objective(t_start, t)
+        n_skipped = 0
+        for t in range(max_t, t_start - 1, -1):
             tgt_sse  = target_objective(t)
+            if prune:
+                bound = tgt_sse + segment_bound(t_start, t)
+                if bound - prune_slack > min_sse:
+                    # Strict because ties go to the smallest t.
+                    n_skipped = t + 1 - t_start
+                    break
+            sacc_sse = saccade_objective(t_start, t)
             sse = sacc_sse + tgt_sse
-            if sse < min_sse:
+            # Scanning backwards, so ties go to the smallest t.
+            if sse <= min_sse:
                 min_sse = sse
                 min_sacc_sse = sacc_sse
                 min_tgt_sse = tgt_sse
                 t_min_sse = t
+        count_candidates(max_t + 1 - t_start, n_skipped)
         return t_min_sse, min_sacc_sse, min_tgt_sse
 
 
+    if prune:
+        magnitude = max(abs(c) for c in list(src_xy) + list(tgt_xy))
+        for i in range(max_t):
+            segment_mem[i + 1] = segment_mem[i] + segment_error(i)
+            magnitude = max(magnitude, abs(g[i][0]), abs(g[i][1]))
+        prune_slack = PRUNE_TOLERANCE * max_t * magnitude * magnitude
+
     # Put limits to initial times
     t_start = min(init_t_start, max_t)
     t_end   = min(init_t_end  , max_t)
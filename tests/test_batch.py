@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from tests import fixtures
+import saccademodel
+import unittest2 as unittest  # to support Python 2.6
+
+class TestBatch(unittest.TestCase):
+
+    def test_fit_batch(self):
+        '''
+        should have a row for each trial matching fit
+        '''
+        X = fixtures.load('synthetic')
+        table = saccademodel.fit_batch([X, X])
+        self.assertEqual(len(table), 2)
+        self.assertEqual(list(table['trial_id']), [0, 1])
+        self.assertEqual(list(table['t_start']), [2, 2])
+        self.assertEqual(list(table['t_end']), [8, 8])
+        self.assertEqual(list(table['duration']), [6.0, 6.0])
+        r = saccademodel.fit(X)
+        self.assertEqual(table['mse'][0], r['mean_squared_error'])
+
+    def test_streaming(self):
+        '''
+        should continue the same table and scale times by framerate
+        '''
+        X = fixtures.load('synthetic')
+        table = saccademodel.fit_batch(iter([X]), framerate=2.0)
+        saccademodel.fit_batch(iter([X]), table=table)
+        self.assertEqual(list(table['trial_id']), [0, 1])
+        self.assertEqual(list(table['latency']), [1.0, 1.0])
+
+    def test_to_numpy(self):
+        '''
+        should convert to a structured array
+        '''
+        try:
+            import numpy  # noqa
+        except ImportError:
+            self.skipTest('numpy is not installed')
+        X = fixtures.load('synthetic')
+        arr = saccademodel.fit_batch([X]).to_numpy()
+        self.assertEqual(arr.shape, (1,))
+        self.assertEqual(arr['t_end'][0], 8)
+
+    def test_fit_batch_parallel(self):
+        '''
+        should give the same table as fit_batch
+        '''
+        try:
+            import multiprocessing.shared_memory  # noqa
+        except ImportError:
+            self.skipTest('multiprocessing.shared_memory is not available')
+        X = fixtures.load('synthetic')
+        trials = [X, X[1:], X[:-1], [[1, 2], [None, 3]]]
+        serial = saccademodel.fit_batch(trials)
+        parallel = saccademodel.fit_batch_parallel(trials, processes=2)
+        self.assertEqual(len(parallel), 4)
+        for name, _ in saccademodel.batch.COLUMNS:
+            self.assertEqual(list(parallel[name]), list(serial[name]))
+
+if __name__ == '__main__':
+    unittest.main()
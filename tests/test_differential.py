@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+'''
+Differential tests that compare every fitting backend against a plain
+reference implementation on randomized synthetic trials.
+
+To add a backend, append a (name, function) pair into MLE_BACKENDS.
+The function must have the signature and return value of
+saccademodel.mle.saccade_model_mle.
+'''
+import random
+import saccademodel
+import saccademodel.em
+from saccademodel.mle import saccade_model_mle
+from saccademodel.em import saccade_model_em_params
+from saccademodel.preprocess import gaze_repair
+import unittest2 as unittest  # to support Python 2.6
+
+# Number of randomized trials for each test.
+N_TRIALS = 2000
+N_EM_TRIALS = 500
+SEED = 20161019
+
+MSE_TOLERANCE = 1e-9
+
+def unpruned_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
+    return saccade_model_mle(gazepoints, src_xy, tgt_xy,
+                             init_t_start, init_t_end, prune=False)
+
+
+MLE_BACKENDS = [
+    ('saccade_model_mle', saccade_model_mle),
+    ('saccade_model_mle without pruning', unpruned_mle),
+]
+
+
+def reference_mle(gazepoints, src_xy, tgt_xy, init_t_start, init_t_end):
+    '''
+    Straightforward implementation of saccade_model_mle without any
+    memoization or pruning. Every candidate time is evaluated.
+    '''
+    g = gazepoints
+    max_t = len(g)
+
+    def square_error(index, mu):
+        dx = g[index][0] - mu[0]
+        dy = g[index][1] - mu[1]
+        return dx * dx + dy * dy
+
+    def source_objective(t_start):
+        sse = 0
+        for i in range(0, t_start):
+            sse = sse + square_error(i, src_xy)
+        return sse
+
+    def saccade_objective(t_start, t_end):
+        sse = 0
+        for i in range(t_start, t_end):
+            alpha = float(i + 0.5 - t_start) / (t_end - t_start)
+            mu = [src_xy[0] * (1 - alpha) + tgt_xy[0] * alpha,
+                  src_xy[1] * (1 - alpha) + tgt_xy[1] * alpha]
+            sse += square_error(i, mu)
+        return sse
+
+    def target_objective(t_end):
+        sse = 0
+        for i in range(max_t - 1, t_end - 1, -1):
+            sse = square_error(i, tgt_xy) + sse
+        return sse
+
+    def argmin(candidates, objective):
+        # The first candidate with the smallest error wins ties.
+        best = None
+        for t in candidates:
+            a, b = objective(t)
+            if best is None or a + b < best[1] + best[2]:
+                best = (t, a, b)
+        return best
+
+    t_start = min(init_t_start, max_t)
+    t_end = min(init_t_end, max_t)
+    if t_end < t_start:
+        t_start, t_end = t_end, t_start
+
+    for _ in range(20):
+        t_start_hat, src_sse, sacc_sse = argmin(
+            range(0, t_end + 1),
+            lambda t: (source_objective(t), saccade_objective(t, t_end)))
+        t_end_hat, sacc_sse, tgt_sse = argmin(
+            range(t_start_hat, max_t + 1),
+            lambda t: (saccade_objective(t_start_hat, t), target_objective(t)))
+        sum_sse = src_sse + sacc_sse + tgt_sse
+        if t_start_hat == t_start and t_end_hat == t_end:
+            break
+        t_start = t_start_hat
+        t_end = t_end_hat
+
+    mse = float(sum_sse) / len(g)
+    return t_start, t_end, mse, src_sse, sacc_sse, tgt_sse
+
+
+def random_trial(rng):
+    '''
+    Generate a synthetic fixation-saccade-fixation trial with noise and
+    gaps. Some trials are degenerate on purpose.
+    '''
+    n = rng.choice([1, 1, 2, 3] + list(range(4, 41)))
+    t_start = rng.choice([0, rng.randint(0, n)])
+    t_end = rng.choice([n, rng.randint(t_start, n)])
+    src = [rng.uniform(-100, 100), rng.uniform(-100, 100)]
+    tgt = rng.choice([src, [rng.uniform(-100, 100), rng.uniform(-100, 100)]])
+    noise = rng.choice([0.0, 0.1, 1.0, 10.0, 100.0])
+    integer = rng.random() < 0.2
+    gap_rate = rng.choice([0.0, 0.0, 0.1, 0.5])
+    # Interpolation needs at least one full point.
+    gapless = rng.randint(0, n - 1)
+
+    trial = []
+    for i in range(n):
+        if i < t_start:
+            mu = src
+        elif i < t_end:
+            alpha = float(i + 0.5 - t_start) / (t_end - t_start)
+            mu = [src[0] * (1 - alpha) + tgt[0] * alpha,
+                  src[1] * (1 - alpha) + tgt[1] * alpha]
+        else:
+            mu = tgt
+        p = [mu[0] + rng.gauss(0, noise), mu[1] + rng.gauss(0, noise)]
+        if integer:
+            p = [int(round(p[0])), int(round(p[1]))]
+        if i != gapless and rng.random() < gap_rate:
+            p[rng.randint(0, 1)] = None
+        trial.append(p)
+
+    return gaze_repair(trial)
+
+
+def random_mle_args(rng, trial):
+    n = len(trial)
+    src_xy = rng.choice([trial[0], trial[rng.randint(0, n - 1)]])
+    tgt_xy = rng.choice([trial[-1], trial[rng.randint(0, n - 1)]])
+    init_t_start = rng.randint(0, n + 1)
+    init_t_end = rng.randint(0, n + 1)
+    return src_xy, tgt_xy, init_t_start, init_t_end
+
+
+def outcome(fn, *args):
+    '''
+    Return the result of the call or the name of the raised exception so
+    that failures are compared too.
+    '''
+    try:
+        return fn(*args)
+    except Exception as e:
+        return type(e).__name__
+
+
+def disagreement(expected, actual):
+    '''
+    Return
+        None if the outcomes agree, otherwise a description.
+    '''
+    if isinstance(expected, str) or isinstance(actual, str):
+        if expected != actual:
+            return 'outcome {0!r} != {1!r}'.format(actual, expected)
+        return None
+    for key in ['t_start', 't_end']:
+        if expected[key] != actual[key]:
+            return '{0} {1} != {2}'.format(key, actual[key], expected[key])
+    d = abs(expected['mse'] - actual['mse'])
+    if d > MSE_TOLERANCE * max(1.0, abs(expected['mse'])):
+        return 'mse {0} != {1}'.format(actual['mse'], expected['mse'])
+    return None
+
+
+def mle_outcome(mle, trial, args):
+    r = outcome(mle, trial, *args)
+    if isinstance(r, str):
+        return r
+    return {'t_start': r[0], 't_end': r[1], 'mse': r[2]}
+
+
+def em_outcome(mle, trial):
+    # saccade_model_em_params looks up the MLE from its module.
+    original = saccademodel.em.saccade_model_mle
+    saccademodel.em.saccade_model_mle = mle
+    try:
+        r = outcome(saccade_model_em_params, trial)
+    finally:
+        saccademodel.em.saccade_model_mle = original
+    if isinstance(r, str):
+        return r
+    return {'t_start': r['t_start'], 't_end': r['t_end'],
+            'mse': r['mean_squared_error']}
+
+
+def shrink(trial, fails):
+    '''
+    Remove points and simplify coordinates as long as the trial still
+    fails.
+
+    Parameter
+        trial, pointlist
+        fails, function that takes a pointlist and returns True on failure
+    Return
+        minimal failing pointlist
+    '''
+    chunk = max(len(trial) // 2, 1)
+    while chunk >= 1:
+        i = 0
+        while i < len(trial):
+            candidate = trial[:i] + trial[i + chunk:]
+            if len(candidate) > 0 and fails(candidate):
+                trial = candidate
+            else:
+                i += chunk
+        chunk = chunk // 2
+
+    for i in range(len(trial)):
+        for k in [0, 1]:
+            for value in [0, int(round(trial[i][k]))]:
+                candidate = [list(p) for p in trial]
+                candidate[i][k] = value
+                if candidate[i][k] != trial[i][k] and fails(candidate):
+                    trial = candidate
+                    break
+    return trial
+
+
+class TestDifferential(unittest.TestCase):
+
+    def assertAgree(self, trial, check):
+        '''
+        Fail with a shrunk trial if check returns a disagreement.
+        '''
+        message = check(trial)
+        if message is None:
+            return
+        minimal = shrink(trial, lambda t: check(t) is not None)
+        self.fail('{0}\nminimal trial: {1!r}'.format(check(minimal), minimal))
+
+    def test_mle_backends(self):
+        '''
+        should find the same times and error as the reference MLE
+        '''
+        rng = random.Random(SEED)
+        for _ in range(N_TRIALS):
+            trial = random_trial(rng)
+            args = random_mle_args(rng, trial)
+            for name, mle in MLE_BACKENDS:
+                def check(t):
+                    expected = mle_outcome(reference_mle, t, args)
+                    actual = mle_outcome(mle, t, args)
+                    message = disagreement(expected, actual)
+                    if message is not None:
+                        return name + ': ' + message
+                self.assertAgree(trial, check)
+
+    def test_em_backends(self):
+        '''
+        should find the same times and error as EM over the reference MLE
+        '''
+        rng = random.Random(SEED + 1)
+        for _ in range(N_EM_TRIALS):
+            trial = random_trial(rng)
+            for name, mle in MLE_BACKENDS:
+                def check(t):
+                    expected = em_outcome(reference_mle, t)
+                    actual = em_outcome(mle, t)
+                    message = disagreement(expected, actual)
+                    if message is not None:
+                        return name + ': ' + message
+                self.assertAgree(trial, check)
+
+    def test_shrink(self):
+        '''
+        should shrink a failing trial to the minimal one
+        '''
+        trial = [[1.5, 2.5], [7.25, 8.0], [3.0, 4.0]]
+        minimal = shrink(trial, lambda t: any(p[0] >= 7 for p in t))
+        self.assertEqual(minimal, [[7, 0]])
+
+if __name__ == '__main__':
+    unittest.main()
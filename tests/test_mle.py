@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from tests import fixtures
+from saccademodel.mle import saccade_model_mle
+import unittest2 as unittest  # to support Python 2.6
+
+class TestMLE(unittest.TestCase):
+
+    def test_prune(self):
+        '''
+        should skip candidates but find the same times
+        '''
+        X = fixtures.load('synthetic')
+        stats = {}
+        r = saccade_model_mle(X, [0, 0], [5, 5], 0, len(X), stats=stats)
+        unpruned_stats = {}
+        unpruned = saccade_model_mle(X, [0, 0], [5, 5], 0, len(X),
+                                     prune=False, stats=unpruned_stats)
+        self.assertEqual(r, unpruned)
+        self.assertEqual(r[:2], (2, 8))
+        self.assertEqual(stats['candidates'], unpruned_stats['candidates'])
+        self.assertEqual(unpruned_stats['skipped'], 0)
+        self.assertTrue(stats['skipped'] > 0)
+
+if __name__ == '__main__':
+    unittest.main()